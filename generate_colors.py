@@ -1,28 +1,185 @@
+from __future__ import annotations
 import os
 import time
-from PIL import Image
+import signal
+import mmap
 import sys 
+import shutil
+import struct
+import zlib
 import zipfile # New import for compression
-import shutil  # New import for directory deletion
+import tarfile
+import io
+import json
 
 # --- Configuration ---
 # The top-level directory where all R folders will be saved.
 OUTPUT_DIR = "all_rgb_colors"
 # File to store the last successfully completed index for resuming.
 RESUME_FILE = os.path.join(OUTPUT_DIR, "resume_index.txt")
+# The hard start parameter has been removed. The program now relies entirely on resume_index.txt.
+# The resume file holds the index as a fixed-width, zero-padded number so it can be
+# updated in place through a memory map.
+RESUME_INDEX_WIDTH = 16
 
 # Setting the range (0 to 255 inclusive).
 COLOR_RANGE = 256
 # Total images = 256 * 256 * 256 = 16,777,216
+# Zero-padded names of every colour value ("000" .. "255"), built once instead of
+# formatting them again for every image.
+NAMES = tuple(f"{i:03d}" for i in range(COLOR_RANGE))
 
 # IMAGE RESOLUTION: 256x256 pixels
 IMAGE_SIZE = (256, 256)
 
-# BATCH CONFIGURATION for I/O Optimization
-# Set to 2048 images for frequent checkpoints.
-BATCH_SIZE = 2048
-# The hard start parameter has been removed. The program now relies entirely on resume_index.txt.
-
+# PER-R OUTPUT CONFIGURATION
+# Each R value (65,536 images) is one unit of work: one archive, one checkpoint of the
+# resume index and one progress line. Stopping with Ctrl+C also checkpoints mid-R.
+# Write buffer for each R archive, so thousands of small PNG entries turn into a
+# few large write() calls.
+ARCHIVE_BUFFER_SIZE = 4 << 20
+# Archive written for each R value: "zip" (OUTPUT_DIR/RRR.zip) or "tar" (OUTPUT_DIR/RRR.tar).
+# Tar archives are plain (uncompressed) streams with no central directory, so they
+# can be read sequentially with constant memory, e.g. when piped to an upload.
+ARCHIVE_FORMAT = "zip"
+# SPRITE SHEET MODE: instead of 65,536 separate images per R value, write one sprite
+# sheet OUTPUT_DIR/RRR.png where the colour (R, G, B) is the SPRITE_TILE_SIZE square
+# tile in row G, column B, plus OUTPUT_DIR/RRR.json mapping every colour to its tile.
+SPRITE_SHEETS = False
+SPRITE_TILE_SIZE = 16
+
+# --- Fast PNG encoding ---
+# Every image is a single solid colour, so the PNG is written by hand instead of
+# going through an imaging library. Signature, IHDR and IEND never change and are built once here.
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """Builds a PNG chunk: length || type || data || CRC32(type + data)."""
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+# IHDR: width, height, bit depth 8, colour type 2 (RGB), default compression/filter, no interlace.
+PNG_HEAD = PNG_SIGNATURE + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', IMAGE_SIZE[0], IMAGE_SIZE[1], 8, 2, 0, 0, 0))
+PNG_TAIL = _png_chunk(b'IEND', b'')
+
+
+# Raw (filtered) image data: one filter byte plus 3 bytes per pixel on every scanline.
+SCANLINE_LENGTH = 1 + 3 * IMAGE_SIZE[0]
+
+# Only the first 4 raw bytes depend on the colour: the first scanline uses the Sub
+# filter (type 1), so it is the filter byte and the colour followed by zeros. Every
+# other scanline uses the Up filter (type 2) and is all zeros. Everything after the
+# colour is identical for every image, so it is deflated once here and reused.
+RAW_REST = bytes(SCANLINE_LENGTH - 4) + (b'\x02' + bytes(SCANLINE_LENGTH - 1)) * (IMAGE_SIZE[1] - 1)
+_rest_compressor = zlib.compressobj(1, zlib.DEFLATED, -15, 8, zlib.Z_RLE)
+DEFLATED_REST = _rest_compressor.compress(RAW_REST) + _rest_compressor.flush()
+del _rest_compressor
+
+# The zlib stream starts with a non-final stored (uncompressed) deflate block holding
+# the 4 colour-dependent bytes, followed by the precomputed (final) blocks of the rest.
+# Stored blocks are byte aligned, so the two can simply be concatenated and the IDAT
+# chunk has the same length for every colour.
+ZLIB_HEADER = b'\x78\x01' # deflate, 32K window, fastest compression
+STORED_BLOCK_HEADER = b'\x00\x04\x00\xfb\xff' # BFINAL=0, BTYPE=00, LEN=4, NLEN=~4
+IDAT_PREFIX = ZLIB_HEADER + STORED_BLOCK_HEADER + b'\x01' # ...then R, G, B
+IDAT_LENGTH = len(IDAT_PREFIX) + 3 + len(DEFLATED_REST) + 4 # + Adler-32 trailer
+
+# Fixed PNG template with zeroed colour bytes, Adler-32 trailer and IDAT CRC. One
+# copy of it is kept and those fields are patched in place for every image.
+PNG_TEMPLATE = (PNG_HEAD + struct.pack('>I', IDAT_LENGTH) + b'IDAT' + IDAT_PREFIX + bytes(3) +
+                DEFLATED_REST + bytes(4) + bytes(4) + PNG_TAIL)
+IDAT_TYPE_OFFSET = len(PNG_HEAD) + 4 # CRC covers the chunk type and data
+COLOR_OFFSET = IDAT_TYPE_OFFSET + 4 + len(IDAT_PREFIX)
+ADLER_OFFSET = COLOR_OFFSET + 3 + len(DEFLATED_REST)
+IDAT_CRC_OFFSET = ADLER_OFFSET + 4
+
+# The raw data is [0x01, R, G, B] + RAW_REST, so its Adler-32 is linear in R, G and B:
+#   sum1 = 1 + sum(data)                 -> base sum1 + R + G + B
+#   sum2 = sum of sum1 after each byte   -> base sum2 + R*(n-1) + G*(n-2) + B*(n-3)
+# where the base sums are those of the data with a black pixel.
+ADLER_BASE = 65521
+RAW_LENGTH = 4 + len(RAW_REST)
+_black_adler32 = zlib.adler32(b'\x01' + bytes(3) + RAW_REST)
+ADLER_SUM1 = _black_adler32 & 0xffff
+ADLER_SUM2 = _black_adler32 >> 16
+
+_png_buffer = bytearray(PNG_TEMPLATE)
+_png_view = memoryview(_png_buffer)
+
+
+def fast_solid_png(r: int, g: int, b: int) -> bytes:
+    """Returns the bytes of a solid-colour PNG of IMAGE_SIZE for (R, G, B)."""
+    png = _png_buffer
+    png[COLOR_OFFSET] = r
+    png[COLOR_OFFSET + 1] = g
+    png[COLOR_OFFSET + 2] = b
+    sum1 = (ADLER_SUM1 + r + g + b) % ADLER_BASE
+    sum2 = (ADLER_SUM2 + r * (RAW_LENGTH - 1) + g * (RAW_LENGTH - 2) + b * (RAW_LENGTH - 3)) % ADLER_BASE
+    struct.pack_into('>I', png, ADLER_OFFSET, (sum2 << 16) | sum1)
+    struct.pack_into('>I', png, IDAT_CRC_OFFSET, zlib.crc32(_png_view[IDAT_TYPE_OFFSET:IDAT_CRC_OFFSET]))
+    return bytes(png)
+
+
+def encode_sprite_sheet(r: int) -> bytes:
+    """Returns the bytes of the sprite sheet PNG for an R value: one tile per (G, B)."""
+    tile = SPRITE_TILE_SIZE
+    width = COLOR_RANGE * tile
+    ihdr = struct.pack('>IIBBBBB', width, width, 8, 2, 0, 0, 0)
+
+    # The first pixel row of each tile row holds the colours (filter None); the other
+    # rows of the tile repeat it, so they use the Up filter and are all zeros.
+    repeated_rows = (b'\x02' + bytes(3 * width)) * (tile - 1)
+    compressor = zlib.compressobj(1)
+    idat = []
+    for g in range(COLOR_RANGE):
+        first_row = b'\x00' + b''.join(bytes((r, g, b)) * tile for b in range(COLOR_RANGE))
+        idat.append(compressor.compress(first_row + repeated_rows))
+    idat.append(compressor.flush())
+
+    return PNG_SIGNATURE + _png_chunk(b'IHDR', ihdr) + _png_chunk(b'IDAT', b''.join(idat)) + PNG_TAIL
+
+def sprite_sheet_index(r: int) -> dict:
+    """Returns the JSON index of an R sprite sheet: colour filename -> [x, y, w, h] of its tile."""
+    tile = SPRITE_TILE_SIZE
+    colors = {}
+    for g in range(COLOR_RANGE):
+        prefix = f"{NAMES[r]}_{NAMES[g]}_"
+        for b in range(COLOR_RANGE):
+            colors[prefix + NAMES[b]] = [b * tile, g * tile, tile, tile]
+    return {'image': f"{NAMES[r]}.png", 'tile_size': tile, 'colors': colors}
+
+def create_sprite_sheets(output_dir: str, start_index: int, max_total: int) -> bool:
+    """
+    Writes one sprite sheet and JSON index per R value, from the R value of start_index
+    up to the one holding the last index. The resume index is saved after every sheet.
+    Returns False if a stop was requested before all sheets were written.
+    """
+    r_first = index_to_rgb(start_index)[0]
+    r_last = index_to_rgb(max_total - 1)[0]
+    for r in range(r_first, r_last + 1):
+        if _stop_requested:
+            print(f"--- Stopped. Generation will resume from R={r} on the next run ---")
+            return False
+
+        start_sheet = time.time()
+        sheet_path = os.path.join(output_dir, f"{NAMES[r]}.png")
+        index_path = os.path.join(output_dir, f"{NAMES[r]}.json")
+        if os.path.exists(index_path):
+            print(f"--- R={r} is already complete on disk. Skipping ---")
+            continue
+        # Both are written under temporary names. The JSON index marks the R value as
+        # complete, so it is renamed last.
+        with open(sheet_path + ".part", 'wb') as f:
+            f.write(encode_sprite_sheet(r))
+        with open(index_path + ".part", 'w') as f:
+            json.dump(sprite_sheet_index(r), f, separators=(',', ':'))
+        sync_and_rename((sheet_path + ".part", sheet_path), (index_path + ".part", index_path))
+
+        last_index = (r + 1) * COLOR_RANGE ** 2 - 1
+        save_resume_index(last_index)
+        print(f"Wrote sprite sheet for R={r} (Total colours: {min(last_index + 1, max_total):,} / {max_total:,}) in {time.time() - start_sheet:.2f} seconds.")
+    return True
 
 def index_to_rgb(index: int) -> tuple[int, int, int]:
     """Converts a linear index (0 to 16777215) back into (R, G, B) tuple."""
@@ -34,12 +191,86 @@ def index_to_rgb(index: int) -> tuple[int, int, int]:
     b = index % g_multiplier
     return r, g, b
 
+def iter_colors(start_index: int, end_index: int):
+    """
+    Yields (index, R, G, B) for every linear index from start_index up to (but not
+    including) end_index. Walks nested R/G/B loops, so only the resume point needs
+    index_to_rgb and no per-image divide/modulo is done.
+    """
+    r_start, g_start, b_start = index_to_rgb(start_index)
+    index = start_index
+    for r in range(r_start, COLOR_RANGE):
+        for g in range(g_start, COLOR_RANGE):
+            for b in range(b_start, COLOR_RANGE):
+                if index >= end_index:
+                    return
+                yield index, r, g, b
+                index += 1
+            b_start = 0
+        g_start = 0
+
+def sync_and_rename(*moves: tuple[str, str]):
+    """
+    Gives finished output files their final names durably: every (temporary, final)
+    pair is flushed to disk first, then renamed in the given order, then the directory
+    is synced. A crash can therefore never leave a final name on incomplete data.
+    Used once per R value rather than per image: images are reproducible, so until
+    their R is complete it is enough that the resume index never points past what is durable.
+    """
+    for temp_path, _ in moves:
+        # Opened for writing: Windows refuses to fsync a read-only file descriptor
+        fd = os.open(temp_path, os.O_RDWR)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    for temp_path, final_path in moves:
+        os.replace(temp_path, final_path)
+
+    # Directory entries of the renamed files (not possible on Windows)
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(os.path.dirname(moves[0][1]) or '.', os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+# Memory map of RESUME_FILE, set up by open_resume_cursor()
+_resume_map = None
+
+def open_resume_cursor():
+    """
+    Memory-maps the resume file for in-place updates. A missing file is created and
+    an index written by an older version (not padded) is padded to RESUME_INDEX_WIDTH.
+    """
+    global _resume_map
+    fd = os.open(RESUME_FILE, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        content = os.read(fd, RESUME_INDEX_WIDTH + 1).strip()
+        if len(content) != RESUME_INDEX_WIDTH:
+            padded = content.zfill(RESUME_INDEX_WIDTH) if content.isdigit() else b' ' * RESUME_INDEX_WIDTH
+            os.ftruncate(fd, 0)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, padded)
+        _resume_map = mmap.mmap(fd, RESUME_INDEX_WIDTH)
+    finally:
+        os.close(fd)
+
+def close_resume_cursor():
+    """Syncs the resume index to disk and unmaps the resume file."""
+    global _resume_map
+    if _resume_map is not None:
+        _resume_map.flush()
+        _resume_map.close()
+        _resume_map = None
+
 def save_resume_index(index: int):
-    """Writes the last completed linear index to the resume file."""
+    """Writes the last completed linear index into the mapped resume file and syncs it to disk."""
     try:
         # Write the index of the last *completed* image
-        with open(RESUME_FILE, 'w') as f:
-            f.write(str(index))
+        _resume_map[:] = f"{index:0{RESUME_INDEX_WIDTH}d}".encode()
+        _resume_map.flush()
     except Exception as e:
         print(f"Error saving resume index: {e}")
 
@@ -59,101 +290,315 @@ def load_resume_index() -> int:
         print(f"Error loading resume index: {e}. Starting from index 0.")
         return 0
 
-def zip_and_delete_folder(folder_path: str, r_dir: str):
-    """Zips the specified R-folder and deletes the original folder."""
-    zip_filename = f"{r_dir}.zip"
-    zip_filepath = os.path.join(os.path.dirname(folder_path), zip_filename)
-    
-    print(f"\n--- ZIPPING folder '{r_dir}' to '{zip_filepath}' ---")
-    
+# Set by the SIGINT/SIGTERM handler; the generation loop checks it once per G value
+# so the archive is closed and the resume index saved before the process exits.
+_stop_requested = False
+
+def request_stop(signum, frame):
+    """
+    Signal handler asking the generation loop to checkpoint and stop. The default
+    action is restored, so a second Ctrl+C still kills a run stuck in a write.
+    """
+    global _stop_requested
+    _stop_requested = True
+    signal.signal(signum, signal.SIG_DFL)
+    print(f"\n--- Received signal {signum}. Stopping after the current G value (repeat to force quit) ---")
+
+def r_archive_path(output_dir: str, r: int) -> str:
+    """Returns the path of the archive holding every image for one R value: OUTPUT_DIR/RRR.zip (or .tar)."""
+    return os.path.join(output_dir, f"{NAMES[r]}.{ARCHIVE_FORMAT}")
+
+def partial_archive_path(output_dir: str, r: int) -> str:
+    """
+    Returns the path an R archive is written to until it is complete: OUTPUT_DIR/RRR.zip.part.
+    Only complete archives carry the final name, so the output directory itself
+    records which R values are done.
+    """
+    return r_archive_path(output_dir, r) + ".part"
+
+class _WriteOnlyStream:
+    """Write-only view of a file object. Without tell()/seek(), zipfile treats it as a stream."""
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+
+    def write(self, data) -> int:
+        return self._fileobj.write(data)
+
+    def flush(self):
+        self._fileobj.flush()
+
+class BufferedZipFile(zipfile.ZipFile):
+    """
+    ZipFile that owns a file opened with an ARCHIVE_BUFFER_SIZE write buffer.
+    New archives are written as a stream: entry sizes go into a data descriptor
+    after each entry, instead of zipfile seeking back to patch the local header,
+    which would flush the write buffer after every image.
+    """
+    def __init__(self, path: str, append: bool):
+        if append:
+            # Appending needs to read the existing central directory, so keep seeking.
+            self._file = open(path, 'r+b', buffering=ARCHIVE_BUFFER_SIZE)
+            fileobj = self._file
+        else:
+            self._file = open(path, 'wb', buffering=ARCHIVE_BUFFER_SIZE)
+            fileobj = _WriteOnlyStream(self._file)
+        try:
+            super().__init__(fileobj, 'a' if append else 'w', zipfile.ZIP_STORED)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._file.close()
+
+class BufferedTarFile:
+    """
+    Uncompressed tar archive with the same writestr()/close() interface as
+    BufferedZipFile. New archives are written in stream mode ('w|'); resumed ones
+    are opened in append mode, which overwrites the end-of-archive marker.
+    """
+    def __init__(self, path: str, append: bool):
+        self._file = open(path, 'r+b' if append else 'wb', buffering=ARCHIVE_BUFFER_SIZE)
+        try:
+            self._tar = tarfile.open(fileobj=self._file, mode='a' if append else 'w|')
+        except BaseException:
+            self._file.close()
+            raise
+        self._mtime = int(time.time())
+
+    def writestr(self, name: str, data: bytes):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = self._mtime
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        try:
+            self._tar.close()
+        finally:
+            self._file.close()
+
+def open_r_archive(output_dir: str, r: int, append: bool) -> BufferedZipFile | BufferedTarFile:
+    """
+    Opens the ARCHIVE_FORMAT archive for an R value. PNG data is already
+    DEFLATE-compressed, so entries are stored as-is instead of being compressed again.
+    """
+    if ARCHIVE_FORMAT == "tar":
+        return BufferedTarFile(partial_archive_path(output_dir, r), append)
+    return BufferedZipFile(partial_archive_path(output_dir, r), append)
+
+def finish_r_archive(output_dir: str, r: int):
+    """Makes a closed, complete R archive durable and gives it its final name."""
+    sync_and_rename((partial_archive_path(output_dir, r), r_archive_path(output_dir, r)))
+
+def skip_completed_r_values(output_dir: str, start_index: int) -> int:
+    """
+    Moves start_index past R values that are already complete on disk: a final
+    RRR.zip / RRR.tar (or RRR.json in sprite sheet mode) exists for them. The
+    resume index is then only needed inside the R value in progress.
+    Returns the index to start from.
+    """
+    if not os.path.isdir(output_dir):
+        return start_index
+
+    extension = ".json" if SPRITE_SHEETS else f".{ARCHIVE_FORMAT}"
+    completed = {int(name[:3]) for name in os.listdir(output_dir)
+                 if name[:3].isdigit() and name[3:] == extension}
+
+    first_r = r = index_to_rgb(start_index)[0]
+    while r in completed:
+        r += 1
+    if r == first_r:
+        return start_index
+
+    print(f"--- R values {first_r} to {r - 1} are already complete on disk. Skipping to R={r} ---")
+    return r * COLOR_RANGE ** 2
+
+def count_archive_entries(archive_path: str) -> int:
+    """Returns the number of images in an R archive. Raises on unreadable archives."""
+    if ARCHIVE_FORMAT == "tar":
+        with tarfile.open(archive_path, 'r') as tf:
+            members = tf.getmembers()
+        # A crash can cut the last image short: its header is there but not its data.
+        if members and members[-1].offset_data + members[-1].size > os.path.getsize(archive_path):
+            raise tarfile.ReadError("last entry is truncated")
+        return len(members)
+
+    with zipfile.ZipFile(archive_path, 'r') as zf:
+        return len(zf.infolist())
+
+def check_resume_archive(output_dir: str, start_index: int) -> int:
+    """
+    When resuming part-way through an R value, verifies that its archive can be
+    appended to and holds exactly the images before the resume point. If it is
+    missing, was left unreadable by a crash or does not match, the whole R value
+    is regenerated from its first image. Returns the index to start from.
+    """
+    r, g, b = index_to_rgb(start_index)
+    if (g, b) == (0, 0):
+        return start_index
+
+    archive_path = partial_archive_path(output_dir, r)
+    expected = g * COLOR_RANGE + b
     try:
-        # Create the zip archive
-        with zipfile.ZipFile(zip_filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # os.walk walks down the directory tree
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    # Create an archive name relative to the parent directory (e.g., 008/000/000.png)
-                    archive_name = os.path.relpath(file_path, os.path.dirname(folder_path))
-                    zipf.write(file_path, archive_name)
-        
-        print(f"Successfully zipped folder '{r_dir}'. Deleting original directory...")
-        
-        # Delete the original R-folder
+        found = count_archive_entries(archive_path)
+        if found == expected:
+            return start_index
+        reason = f"holds {found:,} images, expected {expected:,}"
+    except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+        reason = str(e)
+
+    print(f"Archive '{archive_path}' cannot be resumed ({reason}). Regenerating R={r} from the start.")
+    return r * COLOR_RANGE ** 2
+
+def remove_legacy_r_folder(output_dir: str, r: int):
+    """
+    Deletes OUTPUT_DIR/RRR/, the loose images of an R value left behind when a run of
+    the folder-based version was stopped before zipping it. The R value is written
+    into its archive instead, so the folder would only take up space (and files).
+    """
+    folder_path = os.path.join(output_dir, NAMES[r])
+    if os.path.isdir(folder_path):
+        print(f"Deleting '{folder_path}' left by an older version. R={r} is generated into its archive instead.")
         shutil.rmtree(folder_path)
-        print(f"Deleted original directory: '{folder_path}'")
-        
-    except Exception as e:
-        print(f"CRITICAL ERROR during zip/delete of folder '{r_dir}': {e}")
-        # Halt execution to prevent data loss if zipping fails
-        sys.exit(1)
 
 
-def flush_images(image_buffer: dict, output_dir: str, current_total_count: int, max_total: int):
+# "BBB.png" for every B value, the last part of each archive name
+PNG_FILE_SUFFIXES = tuple(f"{name}.png" for name in NAMES)
+
+def write_r_archive(archive: BufferedZipFile | BufferedTarFile, start_index: int, end_index: int) -> int:
     """
-    Saves all images currently held in the buffer to disk, creates nested
-    directories, and clears the buffer. Writes the resume index on successful completion.
+    Encodes the images from start_index up to (but not including) end_index, which all
+    belong to one R value, and writes them into its archive in index order. Stops
+    early, at the start of the next G value, if a stop was requested.
+    Returns the last index written (start_index - 1 if none were).
     """
-    if not image_buffer:
-        return
-        
-    start_flush = time.time()
-    batch_size = len(image_buffer) 
-    
-    # Track the last index successfully saved in this batch
-    last_completed_index = 0
-    
-    # Perform the burst of I/O operations
-    for index, data in image_buffer.items():
-        r, g, b = data['r'], data['g'], data['b']
-        img = data['img']
-        
-        # 1. Define the nested directory path: OUTPUT_DIR/RRR/GGG/
-        r_dir = f"{r:03d}"
-        g_dir = f"{g:03d}"
-        dir_path = os.path.join(output_dir, r_dir, g_dir)
-        
-        # 2. Ensure the full R/G directory structure exists (recursive mkdir)
-        os.makedirs(dir_path, exist_ok=True)
-        
-        # 3. Define the filename and full path: RRR_GGG_BBB.png
-        filename = f"{r:03d}_{g:03d}_{b:03d}.png"
-        filepath = os.path.join(dir_path, filename)
+    last_written_index = start_index - 1
+    # Archive names keep the nested layout RRR/GGG/RRR_GGG_BBB.png; everything up to
+    # BBB only changes with G, so it is rebuilt once per G value.
+    name_g = None
+    name_prefix = ""
+
+    for index, r, g, b in iter_colors(start_index, end_index):
+        if g != name_g:
+            if _stop_requested:
+                break
+            name_g = g
+            name_prefix = f"{NAMES[r]}/{NAMES[g]}/{NAMES[r]}_{NAMES[g]}_"
+        archive.writestr(name_prefix + PNG_FILE_SUFFIXES[b], fast_solid_png(r, g, b))
+        last_written_index = index
+    return last_written_index
+
+
+def create_r_archives(output_dir: str, start_index: int, max_total: int) -> bool:
+    """
+    Writes one archive per R value, from start_index up to (but not including) max_total.
+    The resume index is saved after every R value, and at the last image written
+    when a stop is requested. Returns False if it stopped before max_total.
+    """
+    start_time = time.time()
+    skipped_images = 0
+
+    # Generate one R value (one archive) at a time
+    current_index = start_index
+    while current_index < max_total:
+        r, g, b = index_to_rgb(current_index)
+        r_end_index = min((r + 1) * COLOR_RANGE ** 2, max_total)
+        start_r = time.time()
+
+        # skip_completed_r_values only skips the finished R values right at the resume
+        # point; later ones (e.g. after the resume file was lost) are kept here
+        if (g, b) == (0, 0) and os.path.exists(r_archive_path(output_dir, r)):
+            print(f"--- R={r} is already complete on disk. Skipping ---")
+            skipped_images += r_end_index - current_index
+            current_index = r_end_index
+            continue
+
+        try:
+            # A run that resumes part-way through an R appends to its existing archive
+            archive = open_r_archive(output_dir, r, append=(g, b) != (0, 0))
+            try:
+                last_saved_index = write_r_archive(archive, current_index, r_end_index)
+            except BaseException:
+                # Closing writes the central directory / end-of-archive blocks, which
+                # usually fails again after a write error (e.g. disk full). Report the
+                # original error; the .part archive is regenerated or rechecked on resume.
+                try:
+                    archive.close()
+                except Exception:
+                    pass
+                raise
+            archive.close()
+        except Exception as e:
+            print(f"Fatal Error generating R={r} (from index {current_index}): {e}")
+            # Exit with an error code so the failure is visible to the caller
+            sys.exit(1)
+
+        if last_saved_index + 1 < r_end_index:
+            # Stop requested: checkpoint the exact position inside this R value
+            if last_saved_index >= current_index:
+                save_resume_index(last_saved_index)
+            print(f"--- Stopped. Generation will resume from index {last_saved_index + 1:,} on the next run ---")
+            return False
+
+        # Give the archive its final name and make it, then the checkpoint, durable.
+        # A limit below COLOR_RANGE cuts the last R value short; its archive keeps the
+        # .part name, so a later full run completes it instead of skipping it.
+        if r_end_index == (r + 1) * COLOR_RANGE ** 2:
+            finish_r_archive(output_dir, r)
+            archive_path = r_archive_path(output_dir, r)
+        else:
+            archive_path = partial_archive_path(output_dir, r)
+        save_resume_index(last_saved_index)
+        current_index = r_end_index
+
+        # Provide progress feedback after each completed R value
+        elapsed = time.time() - start_time
+        avg_rate = (current_index - start_index - skipped_images) / elapsed
+        remaining_time_sec = (max_total - current_index) / avg_rate if avg_rate > 0 else 0
         
-        # 4. Save the image
-        img.save(filepath, format='PNG')
+        hours = int(remaining_time_sec // 3600)
+        minutes = int((remaining_time_sec % 3600) // 60)
         
-        last_completed_index = index
+        print(f"\n--- Wrote archive '{archive_path}' in {time.time() - start_r:.2f} seconds ---")
+        print(f"Overall Progress: {current_index:,} total images saved. Rate: {avg_rate:.2f} img/s. Estimated time remaining: {hours}h {minutes}m.")
 
-    # Clear the buffer to free up memory for the next batch
-    image_buffer.clear()
-    
-    # --- RESUME SAFETY: Only save index if the entire file write loop completed successfully ---
-    if last_completed_index > 0:
-        save_resume_index(last_completed_index)
+        if _stop_requested:
+            print(f"--- Stopped. Generation will resume from index {current_index:,} on the next run ---")
+            return False
 
-    end_flush = time.time()
-    current_count = last_completed_index + 1 
-    print(f"\nFlushed batch of {batch_size:,} images (Total saved: {current_count:,} / {max_total:,}) in {end_flush - start_flush:.2f} seconds.")
+    return True
 
 
 def create_color_images(limit=COLOR_RANGE):
     """
     Generates a 256x256 pixel PNG image for every RGB combination,
-    using a memory buffer and nested folders, with zip-and-delete cleanup.
+    streaming each R value straight into its own archive.
     """
     if limit > COLOR_RANGE:
         limit = COLOR_RANGE
 
     total_images_to_generate = limit ** 3
     
-    # Load the index of the image *next* to be generated (starts at 0 if no resume file exists)
-    start_index = load_resume_index() 
+    # Load the index of the image *next* to be generated (starts at 0 if no resume file exists),
+    # skipping R values whose archives are already complete
+    start_index = skip_completed_r_values(OUTPUT_DIR, load_resume_index())
+    start_index = check_resume_archive(OUTPUT_DIR, start_index)
+    # A stopped run of the folder-based version leaves the loose images of its R value behind
+    if start_index < total_images_to_generate:
+        remove_legacy_r_folder(OUTPUT_DIR, index_to_rgb(start_index)[0])
     
     r_start, g_start, b_start = index_to_rgb(start_index)
     
     print(f"--- Starting image generation up to R, G, B = {limit-1} ---")
-    print(f"Resolution: {IMAGE_SIZE[0]}x{IMAGE_SIZE[1]}. Batch Size: {BATCH_SIZE} files.")
+    if SPRITE_SHEETS:
+        sheet_size = COLOR_RANGE * SPRITE_TILE_SIZE
+        print(f"Sprite sheets: one {sheet_size}x{sheet_size} sheet per R value ({SPRITE_TILE_SIZE}x{SPRITE_TILE_SIZE} tile per colour) plus a JSON index.")
+    else:
+        print(f"Resolution: {IMAGE_SIZE[0]}x{IMAGE_SIZE[1]}. One archive per R value ({COLOR_RANGE ** 2:,} files).")
     print(f"Total images to generate: {total_images_to_generate:,}")
     
     if start_index > 0:
@@ -163,81 +608,29 @@ def create_color_images(limit=COLOR_RANGE):
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
         print(f"Created output directory: '{OUTPUT_DIR}'")
+    open_resume_cursor()
 
-    start_time = time.time()
-    image_buffer = {} # Dictionary to store image metadata and objects
-
-    # 2. Iterate through all remaining indices
-    for current_index in range(start_index, total_images_to_generate):
-        r, g, b = index_to_rgb(current_index)
-        color = (r, g, b)
+    # Checkpoint cleanly on Ctrl+C / kill instead of losing the R value in progress.
+    # The previous handlers are restored once generation returns.
+    global _stop_requested
+    _stop_requested = False
+    previous_handlers = {signum: signal.signal(signum, request_stop) for signum in (signal.SIGINT, signal.SIGTERM)}
 
-        try:
-            # Create the image in memory
-            img = Image.new('RGB', IMAGE_SIZE, color)
-            
-            # Store the image and metadata in the buffer, keyed by its linear index
-            image_buffer[current_index] = {'r': r, 'g': g, 'b': b, 'img': img}
-            
-            # Check if the buffer is full (batch size reached)
-            if len(image_buffer) >= BATCH_SIZE:
-                
-                # Write all buffered images to disk in one go and update resume file
-                flush_images(image_buffer, OUTPUT_DIR, current_index + 1, total_images_to_generate)
-
-                # --- CLEANUP LOGIC: Check if an R-folder was just completed ---
-                
-                # last_saved_index is the last index written and checkpointed
-                last_saved_index = load_resume_index() - 1 
-                
-                # Check if the next index to be generated is exactly the start of a new R folder.
-                # If (last_saved_index + 1) is exactly divisible by 256*256, the previous R folder is complete.
-                if (last_saved_index + 1) % (COLOR_RANGE**2) == 0:
-                    r_completed = index_to_rgb(last_saved_index)[0]
-                    
-                    r_dir_to_zip = f"{r_completed:03d}"
-                    folder_to_zip_path = os.path.join(OUTPUT_DIR, r_dir_to_zip)
-                    
-                    # Only zip and delete if the folder actually exists
-                    if os.path.exists(folder_to_zip_path):
-                        zip_and_delete_folder(folder_to_zip_path, r_dir_to_zip)
-
-
-                # Provide progress feedback after a successful flush
-                elapsed = time.time() - start_time
-                avg_rate = (current_index + 1 - start_index) / elapsed
-                remaining_time_sec = (total_images_to_generate - (current_index + 1)) / avg_rate if avg_rate > 0 else 0
-                
-                hours = int(remaining_time_sec // 3600)
-                minutes = int((remaining_time_sec % 3600) // 60)
-                
-                print(f"Overall Progress: {current_index + 1:,} total images saved. Rate: {avg_rate:.2f} img/s. Estimated time remaining: {hours}h {minutes}m.")
-                
-                # --- Self-Kill for automatic restart/resumption after batch completion ---
-                print("\n--- Batch completed and index saved. Triggering self-exit for controlled resumption ---")
-                sys.exit(0)
+    start_time = time.time()
 
+    try:
+        if SPRITE_SHEETS:
+            completed = create_sprite_sheets(OUTPUT_DIR, start_index, total_images_to_generate)
+        else:
+            completed = create_r_archives(OUTPUT_DIR, start_index, total_images_to_generate)
+    finally:
+        for signum, handler in previous_handlers.items():
+            if handler is not None:
+                signal.signal(signum, handler)
+        close_resume_cursor()
+    if not completed:
+        return
 
-        except Exception as e:
-            print(f"Fatal Error processing image {r},{g},{b} (Index {current_index}): {e}")
-            # Attempt to flush what was generated before exiting on error
-            flush_images(image_buffer, OUTPUT_DIR, current_index, total_images_to_generate)
-            # Exit with an error code so the run script can potentially detect it
-            sys.exit(1) 
-
-    # 3. Flush any remaining images after the loops finish
-    if image_buffer:
-        flush_images(image_buffer, OUTPUT_DIR, total_images_to_generate, total_images_to_generate)
-        
-    # --- Final Cleanup of the last R-folder ---
-    # The last folder might not have triggered the zip/delete if the job completed
-    # exactly at the total image count boundary.
-    last_r_index = limit - 1
-    r_dir_to_zip = f"{last_r_index:03d}"
-    folder_to_zip_path = os.path.join(OUTPUT_DIR, r_dir_to_zip)
-    if os.path.exists(folder_to_zip_path):
-        zip_and_delete_folder(folder_to_zip_path, r_dir_to_zip)
-            
     # Clean up the resume file since the job is complete
     if os.path.exists(RESUME_FILE):
         os.remove(RESUME_FILE)
@@ -245,6 +638,10 @@ def create_color_images(limit=COLOR_RANGE):
     end_time = time.time()
     duration = end_time - start_time
 
+    if SPRITE_SHEETS:
+        print(f"\n--- Sprite sheets complete in {duration:.2f} seconds ---")
+        return
+
     print("\n--- Generation Complete ---")
     print(f"Total images saved: {total_images_to_generate:,}")
     print(f"Time taken (for this run): {duration:.2f} seconds")